@@ -1,56 +1,137 @@
 import random
+import numpy as np
 
 PieceScore={"K":0,"Q":9,"R":5,"B":3,"N":3,"p":1}
 CHECKMATE=1000
 STALEMATE=0
 
+"""
+piece-square tables from white's point of view (row 0 is the 8th rank), in pawn units
+"""
+PieceSquareScore={
+    "p":np.array([[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+                  [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5],
+                  [0.1, 0.1, 0.2, 0.3, 0.3, 0.2, 0.1, 0.1],
+                  [0.05,0.05,0.1, 0.25,0.25,0.1, 0.05,0.05],
+                  [0.0, 0.0, 0.0, 0.2, 0.2, 0.0, 0.0, 0.0],
+                  [0.05,-0.05,-0.1,0.0,0.0,-0.1,-0.05,0.05],
+                  [0.05,0.1, 0.1,-0.2,-0.2, 0.1, 0.1, 0.05],
+                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]),
+    "N":np.array([[-0.5,-0.4,-0.3,-0.3,-0.3,-0.3,-0.4,-0.5],
+                  [-0.4,-0.2, 0.0, 0.0, 0.0, 0.0,-0.2,-0.4],
+                  [-0.3, 0.0, 0.1, 0.15,0.15,0.1, 0.0,-0.3],
+                  [-0.3, 0.05,0.15,0.2, 0.2, 0.15,0.05,-0.3],
+                  [-0.3, 0.0, 0.15,0.2, 0.2, 0.15,0.0,-0.3],
+                  [-0.3, 0.05,0.1, 0.15,0.15,0.1, 0.05,-0.3],
+                  [-0.4,-0.2, 0.0, 0.05,0.05,0.0,-0.2,-0.4],
+                  [-0.5,-0.4,-0.3,-0.3,-0.3,-0.3,-0.4,-0.5]]),
+    "B":np.array([[-0.2,-0.1,-0.1,-0.1,-0.1,-0.1,-0.1,-0.2],
+                  [-0.1, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,-0.1],
+                  [-0.1, 0.0, 0.05,0.1, 0.1, 0.05,0.0,-0.1],
+                  [-0.1, 0.05,0.05,0.1, 0.1, 0.05,0.05,-0.1],
+                  [-0.1, 0.0, 0.1, 0.1, 0.1, 0.1, 0.0,-0.1],
+                  [-0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,-0.1],
+                  [-0.1, 0.05,0.0, 0.0, 0.0, 0.0, 0.05,-0.1],
+                  [-0.2,-0.1,-0.1,-0.1,-0.1,-0.1,-0.1,-0.2]]),
+    "R":np.array([[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+                  [0.05,0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.05],
+                  [-0.05,0.0,0.0, 0.0, 0.0, 0.0, 0.0,-0.05],
+                  [-0.05,0.0,0.0, 0.0, 0.0, 0.0, 0.0,-0.05],
+                  [-0.05,0.0,0.0, 0.0, 0.0, 0.0, 0.0,-0.05],
+                  [-0.05,0.0,0.0, 0.0, 0.0, 0.0, 0.0,-0.05],
+                  [-0.05,0.0,0.0, 0.0, 0.0, 0.0, 0.0,-0.05],
+                  [0.0, 0.0, 0.0, 0.05,0.05,0.0, 0.0, 0.0]]),
+    "Q":np.array([[-0.2,-0.1,-0.1,-0.05,-0.05,-0.1,-0.1,-0.2],
+                  [-0.1, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,-0.1],
+                  [-0.1, 0.0, 0.05,0.05,0.05,0.05,0.0,-0.1],
+                  [-0.05,0.0,0.05,0.05,0.05,0.05,0.0,-0.05],
+                  [0.0, 0.0, 0.05,0.05,0.05,0.05,0.0,-0.05],
+                  [-0.1, 0.05,0.05,0.05,0.05,0.05,0.0,-0.1],
+                  [-0.1, 0.0, 0.05,0.0, 0.0, 0.0, 0.0,-0.1],
+                  [-0.2,-0.1,-0.1,-0.05,-0.05,-0.1,-0.1,-0.2]]),
+    "K":np.array([[-0.3,-0.4,-0.4,-0.5,-0.5,-0.4,-0.4,-0.3],
+                  [-0.3,-0.4,-0.4,-0.5,-0.5,-0.4,-0.4,-0.3],
+                  [-0.3,-0.4,-0.4,-0.5,-0.5,-0.4,-0.4,-0.3],
+                  [-0.3,-0.4,-0.4,-0.5,-0.5,-0.4,-0.4,-0.3],
+                  [-0.2,-0.3,-0.3,-0.4,-0.4,-0.3,-0.3,-0.2],
+                  [-0.1,-0.2,-0.2,-0.2,-0.2,-0.2,-0.2,-0.1],
+                  [0.2, 0.2, 0.0, 0.0, 0.0, 0.0, 0.2, 0.2],
+                  [0.2, 0.3, 0.1, 0.0, 0.0, 0.1, 0.3, 0.2]])
+}
+
+"""
+boards are encoded as integer arrays: every square holds the index of its piece in PieceCodes
+(kept sorted so that np.searchsorted can encode a whole batch of boards at once)
+"""
+PieceCodes=np.array(["--","bB","bK","bN","bQ","bR","bp","wB","wK","wN","wQ","wR","wp"])
+Squares=np.arange(64)
+MaterialValue=np.zeros(len(PieceCodes))  # material of each piece code, positive for white
+SquareValue=np.zeros((len(PieceCodes),64))  # material plus piece-square score of each piece code on each square
+for Code,Piece in enumerate(PieceCodes):
+    if Piece[0]=="w":
+        MaterialValue[Code]=PieceScore[Piece[1]]
+        SquareValue[Code]=PieceScore[Piece[1]]+PieceSquareScore[Piece[1]].ravel()
+    elif Piece[0]=="b":
+        MaterialValue[Code]=-PieceScore[Piece[1]]
+        SquareValue[Code]=-(PieceScore[Piece[1]]+PieceSquareScore[Piece[1]][::-1].ravel())  # mirror the table for black
+
 def FindRandomMove(ValidMoves):
        return ValidMoves[random.randint(0,len(ValidMoves)-1)]
 
 
 def FindBestMove(gs,ValidMoves):
     TurnMultiplier = 1 if gs.WhiteToMove else -1  # Multiplier to evaluate from the perspective of the player to move
-    OpponentMinMaxScore = CHECKMATE  # Initialize the maximum score to a very low value (representing losing for the player)
     BestPlayerMove = None  # Initialize the best move as None
     random.shuffle(ValidMoves)
-    for PlayerMove in ValidMoves:  # Loop over all valid moves
+    OpponentMaxScores = np.full(len(ValidMoves), -CHECKMATE, dtype=float)  # Best reply score found for every player move
+    LeafBoards = []  # Leaf positions that still need to be evaluated, scored together as one batch
+    LeafOwners = []  # Index of the player move each leaf position belongs to
+    for i, PlayerMove in enumerate(ValidMoves):  # Loop over all valid moves
         gs.MakeMove(PlayerMove)  # Make the move on the game state
         OpponentsMoves=gs.GetValidMoves()
-        OpponentMaxScore=-CHECKMATE
         for OpponentsMove in OpponentsMoves:
             gs.MakeMove(OpponentsMove)
             if gs.CheckMate:  # Check if the game is in checkmate after the move
                 score = -TurnMultiplier *CHECKMATE  # Winning score for the current player
+                OpponentMaxScores[i] = max(OpponentMaxScores[i], score)
             elif gs.StaleMate:  # Check if the game is in stalemate
                 score = STALEMATE  # Neutral score for stalemate
+                OpponentMaxScores[i] = max(OpponentMaxScores[i], score)
             else:
-                # If no checkmate or stalemate, evaluate the board based on material
-                score = -TurnMultiplier * ScoreMaterial(gs.board)
-
-            # If the score for this move is better than the current max score, update the best move
-            if score > OpponentMaxScore:
-                OpponentMaxScore = score  # Update the maximum score found so far
-
-
+                # If no checkmate or stalemate, keep a copy of the board so it is evaluated with the rest of the batch
+                LeafBoards.append(gs.board.copy())
+                LeafOwners.append(i)
             gs.UndoMove()  # Undo the move to restore the board state for the next iteration
-        if OpponentMaxScore < OpponentMinMaxScore:
-            OpponentMinMaxScore=OpponentMaxScore
-            BestPlayerMove=PlayerMove
         gs.UndoMove()
+    if LeafBoards:
+        # Evaluate every leaf at once and keep the best reply score for each player move
+        LeafScores = -TurnMultiplier * ScoreBoards(np.stack(LeafBoards))
+        np.maximum.at(OpponentMaxScores, LeafOwners, LeafScores)
+    if len(ValidMoves) > 0:
+        BestIndex = int(np.argmin(OpponentMaxScores))  # Player move that minimises the opponent's best reply
+        if OpponentMaxScores[BestIndex] < CHECKMATE:
+            BestPlayerMove = ValidMoves[BestIndex]
     return BestPlayerMove  # Return the best move found
 
 
+"""
+encode one board, or a batch of boards, into arrays of piece codes with one entry per square
+"""
+def EncodeBoards(boards):
+    boards = np.asarray(boards)
+    return np.searchsorted(PieceCodes, boards.reshape(-1, 64)).astype(np.int8)
+
+
+"""
+score a batch of boards on base of material and piece-square tables (positive is good for white)
+"""
+def ScoreBoards(boards):
+    return SquareValue[EncodeBoards(boards), Squares].sum(axis=1)
+
+
 """
 score the board on base of material
 """
 def ScoreMaterial(board):
-    score=0
-    for row in board:
-        for square in row:
-            if square[0]=="w":
-                score+=PieceScore[square[1]]
-            elif square[0]=="b":
-                score-=PieceScore[square[1]]
-
-    return score
+    return MaterialValue[EncodeBoards(board)].sum()
 